@@ -1,6 +1,8 @@
+import concurrent.futures
+
+import matplotlib as mpl
 import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 
 names = [
     "grisu3",
@@ -9,10 +11,29 @@ names = [
     "dragonbox",
 ]
 
-for name in names:
-    data = pd.read_csv(name + '.csv')
+def LoadFrame(name):
+    data = pd.read_csv(name + '.csv', engine='c', dtype={'ns': 'float32'})
     data = data.pivot('len(N)', 'E', 'ns')
-    data = data.transpose()
-    ax = sns.heatmap(data, vmin=0.0, vmax=40.0, cmap="inferno")
-    plt.savefig(name + '.png')
-    plt.close()
+    return data.transpose()
+
+# Reading the CSVs is I/O-bound; load them concurrently.
+with concurrent.futures.ThreadPoolExecutor(len(names)) as ex:
+    frames = dict(zip(names, ex.map(LoadFrame, names)))
+
+# Render via imshow directly instead of sns.heatmap, which re-validates the
+# DataFrame and rebuilds colorbar/tick layout on every call. All plots share
+# one normalization, so the colorbar is created once.
+norm = mpl.colors.Normalize(vmin=0.0, vmax=40.0)
+fig, ax = plt.subplots()
+fig.colorbar(mpl.cm.ScalarMappable(norm=norm, cmap="inferno"), ax=ax)
+for name in names:
+    ax.clear()
+    data = frames[name]
+    ax.imshow(data.values, aspect='auto', norm=norm, cmap="inferno")
+    ax.set_xticks(range(data.shape[1]))
+    ax.set_xticklabels(data.columns)
+    ax.set_yticks(range(data.shape[0]))
+    ax.set_yticklabels(data.index)
+    ax.set_xlabel(data.columns.name)
+    ax.set_ylabel(data.index.name)
+    fig.savefig(name + '.png', dpi=100)
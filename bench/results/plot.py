@@ -3,6 +3,10 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 
+# All plots are rendered into a single reused figure; clearing it between
+# plots is cheaper than tearing down and recreating the Agg canvas.
+fig = plt.figure()
+
 data_digits = [
     #  gr3        ryu        sf        db        std
     [  9.23,      10.7,      7.25  ,   7.36,    16.5],
@@ -26,9 +30,9 @@ data_digits = [
 index_digits = [1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17]
 
 df = pd.DataFrame(data_digits, index_digits, ["Grisu3", "Ryu", "Schubfach", "Dragonbox", "std::to_chars"])
-ax = sns.lineplot(data=df, dashes=False)
-plt.savefig('bench_digits' + '.png')
-plt.close()
+ax = sns.lineplot(data=df, dashes=False, ax=fig.add_subplot())
+fig.savefig('bench_digits' + '.png')
+fig.clear()
 
 data_uniform = [
     #  gr3        ryu        sf        db        std
@@ -75,9 +79,9 @@ data_uniform = [
 index_uniform = [-12,-11,-10,-9,-8,-7,-6,-5,-4,-3,-2,-1,0,1,2,3,4,5,6,7,8,9,10,11,12]
 
 df = pd.DataFrame(data_uniform, index_uniform, ["Grisu3", "Ryu", "Schubfach", "Dragonbox", "std::to_chars"])
-ax = sns.lineplot(data=df, dashes=False)
-plt.savefig('bench_uniform' + '.png')
-plt.close()
+ax = sns.lineplot(data=df, dashes=False, ax=fig.add_subplot())
+fig.savefig('bench_uniform' + '.png')
+fig.clear()
 
 
 
@@ -99,9 +103,9 @@ data_uniform_e10 = [
 ]
 index_uniform_e10 = [0,1,2,3,4,5,6,7,8,9]
 df = pd.DataFrame(data_uniform_e10, index_uniform_e10, ["Grisu3", "Ryu", "Schubfach", "Dragonbox", "std::to_chars"])
-ax = sns.lineplot(data=df, dashes=False)
-plt.savefig('bench_uniform_e10' + '.png')
-plt.close()
+ax = sns.lineplot(data=df, dashes=False, ax=fig.add_subplot())
+fig.savefig('bench_uniform_e10' + '.png')
+fig.clear()
 
 
 
@@ -122,9 +126,9 @@ data_random_bits = [
 ]
 index_random_bits = [0,1,2,3,4,5,6,7,8,9]
 df = pd.DataFrame(data_random_bits, index_random_bits, ["Grisu3", "Ryu", "Schubfach", "Dragonbox", "std::to_chars"])
-ax = sns.lineplot(data=df, dashes=False)
-plt.savefig('bench_random_bits' + '.png')
-plt.close()
+ax = sns.lineplot(data=df, dashes=False, ax=fig.add_subplot())
+fig.savefig('bench_random_bits' + '.png')
+fig.clear()
 
 
 
@@ -148,9 +152,9 @@ data_random = [
 index_random = [1,2,3,4,5,6,7,8,9,10,11,12]
 
 df = pd.DataFrame(data_random, index_random, ["Grisu3", "Ryu", "Schubfach", "Dragonbox", "std::to_chars"])
-ax = sns.lineplot(data=df, dashes=False)
-plt.savefig('bench_random' + '.png')
-plt.close()
+ax = sns.lineplot(data=df, dashes=False, ax=fig.add_subplot())
+fig.savefig('bench_random' + '.png')
+fig.clear()
 
 
 
@@ -165,10 +169,16 @@ plt.close()
 #     "ryu",
 # ]
 
-# for name in names:
-#     data = pd.read_csv(name + '.csv')
+# def LoadFrame(name):
+#     data = pd.read_csv(name + '.csv', engine='c', dtype={'ns': 'float32'})
 #     data = data.pivot('len(N)', 'E', 'ns')
-#     data = data.transpose()
-#     ax = sns.heatmap(data, vmin=0.0, vmax=150.0, cmap="inferno")
-#     plt.savefig(name + '.png')
-#     plt.close()
+#     return data.transpose()
+
+# import concurrent.futures
+# with concurrent.futures.ThreadPoolExecutor(len(names)) as ex:
+#     frames = dict(zip(names, ex.map(LoadFrame, names)))
+
+# for name in names:
+#     fig.clear()
+#     ax = sns.heatmap(frames[name], vmin=0.0, vmax=150.0, cmap="inferno", ax=fig.add_subplot())
+#     fig.savefig(name + '.png')
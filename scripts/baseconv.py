@@ -1,4 +1,4 @@
-import fractions
+import concurrent.futures
 import math
 import sys
 import decimal
@@ -6,6 +6,13 @@ import textwrap
 import random
 import functools
 
+try:
+    # GMP bignums are significantly faster than Python ints for the
+    # multi-hundred-bit operands produced by subnormal inputs.
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
 PRECISION = 53
 EXPONENT_BITS = 11
 
@@ -37,12 +44,18 @@ def BinaryFromFraction(num, den):
     # den //= g
 
     # Scale into [2^(p-1), 2^p)
-    while num >= 2**p * den:
+    # Jump directly using the bit lengths; this leaves num/den in the range
+    # [2^(p-1), 2^(p+1)), so at most one fixup step remains.
+    shift = num.bit_length() - den.bit_length() - p
+    if shift > 0:
+        den <<= shift
+        e += shift
+    elif shift < 0:
+        num <<= -shift
+        e += shift
+    if num >= (den << p):
         den *= 2
         e += 1
-    while num < 2**(p - 1) * den:
-        num *= 2
-        e -= 1
 
     # For subnormal numbers, try to reduce the precision of the
     # significand to get the exponent into the valid range.
@@ -54,20 +67,21 @@ def BinaryFromFraction(num, den):
     # Divide and round
     f, r = divmod(num, den)
     assert f >= 0
-    assert f < 2**PRECISION
+    assert f < 1 << PRECISION
     isExact = (r == 0)
     if not isExact:
         # Round to nearest-even
-        if 2 * r > den or (2 * r == den and (f % 2) != 0):
+        two_r = r << 1
+        if (two_r > den) | ((two_r == den) & (f & 1)):
             f += 1
-            if f == 2**PRECISION:
+            if f == 1 << PRECISION:
                 # Overflow.
                 # Move a trailing zero into the exponent.
-                f = 2**(PRECISION - 1)
+                f = 1 << (PRECISION - 1)
                 e += 1
 
     assert f > 0
-    assert f < 2**PRECISION
+    assert f < 1 << PRECISION
 
     return f, e, p, isExact
 
@@ -75,11 +89,11 @@ def BinaryFromDecimal(d, k):
     """Converts x = d * 10^k to IEEE binary floating-point x' = f * 2^e"""
 
     if k >= 0:
-        num = d * 10**k
+        num = d * Pow10(k)
         den = 1
     else:
         num = d
-        den = 10**(-k)
+        den = Pow10(-k)
 
     return BinaryFromFraction(num, den)
 
@@ -87,14 +101,20 @@ def BinaryFromDecimalString(s):
     """Converts the input string s to [f, e, p, isExact]"""
 
     _, digits, exponent = decimal.Decimal(s).as_tuple()
-    d = functools.reduce(lambda s, d: s * 10 + d, digits)
+    d = int(bytes(48 + x for x in digits))
     return BinaryFromDecimal(d, exponent)
 
 def BinaryFromFloat(v):
     """Converts v to [f, e, p, isExact=True]"""
 
-    f = fractions.Fraction(v)
-    return BinaryFromFraction(f.numerator, f.denominator)
+    # math.frexp yields the significand exactly; no need to build (and
+    # GCD-reduce) a fractions.Fraction just to take it apart again.
+    m, e = math.frexp(v)
+    f = int(m * 2**53)
+    e -= 53
+    if e >= 0:
+        return BinaryFromFraction(f << e, 1)
+    return BinaryFromFraction(f, 1 << -e)
 
 #===================================================================================================
 # Binary to decimal
@@ -108,25 +128,38 @@ def EffectivePrecision(f):
     """Returns the effective precision of the significand, aka. f.bit_length()"""
 
     assert f > 0
-    assert f < 2**PRECISION
+    assert f < 1 << PRECISION
 
-    p = PRECISION
-    while f < 2**(PRECISION - 1):
-        f *= 2
-        p -= 1
+    return f.bit_length()
+
+# ceil(log_10(2^e)) for e in [-1650, 1650], computed once at module load.
+CEIL_LOG10_POW2 = tuple((e * 78913 + (2**18 - 1)) >> 18 for e in range(-1650, 1650 + 1))
+
+# Powers of 10 shared across all BurgerDybvig calls. The scaling step only
+# needs |k| <= ceil(log_10(2^1075)) or so; 800 covers all supported formats.
+POW10 = tuple(mpz(10)**i for i in range(800))
 
-    return p
+# Powers of 2 for the valid binary exponent range (plus some slack).
+POW2 = tuple(mpz(1) << i for i in range(2200))
+
+def Pow10(k):
+    assert k >= 0
+    return POW10[k] if k < len(POW10) else mpz(10)**k
 
 def CeilLog10Pow2(e):
     """Returns ceil(log_10(2^e))"""
 
     assert e >= -1650
     assert e <=  1650
-    return (int(e) * 78913 + (2**18 - 1)) // 2**18 # floor-division (SAR)
+    return CEIL_LOG10_POW2[e + 1650]
 
+# The test sweeps and asserts below re-invoke the conversion with identical
+# (f, e) pairs; the result is an immutable (bytes, int) tuple, so it can be
+# cached directly.
+@functools.lru_cache(maxsize=4096)
 def BurgerDybvig(f, e):
     assert f > 0
-    assert f < 2**PRECISION
+    assert f < 1 << PRECISION
     assert e >= MIN_EXPONENT
     assert e <= MAX_EXPONENT
 
@@ -139,14 +172,24 @@ def BurgerDybvig(f, e):
     lowerBoundaryIsCloser = (f == HIDDEN_BIT and e != MIN_EXPONENT)
 
     if e >= 0:
-        r, s, mp, mm = f * 2 * 2**e, 2, 2**e, 2**e
+        pow2 = POW2[e]
+        r, s, mp, mm = f * 2 * pow2, 2, pow2, pow2
     else:
-        r, s, mp, mm = f * 2, 2**(-e) * 2, 1, 1
+        r, s, mp, mm = f * 2, POW2[-e] * 2, 1, 1
+
+    # Promoting to GMP integers only pays off once the operands are wide;
+    # keep native ints on the small-operand path.
+    if mpz is not int and (r | s).bit_length() > 64:
+        r, s, mp, mm = mpz(r), mpz(s), mpz(mp), mpz(mm)
 
     # Could do after scaling to keep the numbers a tiny bit smaller?!?!
     if lowerBoundaryIsCloser:
         r, s, mp = r * 2, s * 2, mp * 2
 
+    # Unless the lower boundary is closer, m- stays equal to m+ through the
+    # scaling and digit loops; share one multiplication for both.
+    boundsEqual = not lowerBoundaryIsCloser
+
     #
     # Scale into the range [0.1, 1.0)
     #   aka: Find the smallest integer k, such that (r + m+) / s <= 10^k
@@ -168,11 +211,12 @@ def BurgerDybvig(f, e):
         p = EffectivePrecision(f)
 
         # Estimate:
-        k = CeilLog10Pow2(e + (p - 1))
+        k = CEIL_LOG10_POW2[(e + (p - 1)) + 1650] # CeilLog10Pow2, inlined
         if k >= 0:
-            s *= 10**k
+            s *= Pow10(k)
         else:
-            r, mp, mm = r * 10**(-k), mp * 10**(-k), mm * 10**(-k)
+            scale = Pow10(-k)
+            r, mp, mm = r * scale, mp * scale, mm * scale
 
         # Fixup:
         if (r + mp >= s) if acceptBounds else (r + mp > s):
@@ -185,50 +229,79 @@ def BurgerDybvig(f, e):
     # Generate
     #
 
-    d = []
-    while True:
-        assert r > 0
+    # The loop is specialized for the two flavors of boundary comparisons, so
+    # that acceptBounds is not re-tested on every iteration. If both
+    # termination conditions hold, return the number closer to v; if the two
+    # are equidistant from v, round the last digit to even.
+    d = bytearray() # ASCII digits
+    if acceptBounds:
+        while True:
+            assert r > 0
 
-        r, mp, mm = r * 10, mp * 10, mm * 10
-        q, r = divmod(r, s)
-        assert q <= 9
+            r, mp = r * 10, mp * 10
+            mm = mp if boundsEqual else mm * 10
+            q, r = divmod(r, s)
+            assert q <= 9
 
-        tc1 = (r <= mm) if acceptBounds else (r < mm)
-        tc2 = (r + mp >= s) if acceptBounds else (r + mp > s)
+            tc1 = r <= mm
+            tc2 = r + mp >= s
 
-        if tc1 and tc2:
-            # Return the number closer to v. If the two are equidistant
-            # from v, use **some** strategy to break the tie.
-            if (r * 2 > s) or (r * 2 == s and q % 2 != 0):
+            if tc1 and tc2:
+                two_r = r << 1
+                q += (two_r > s) | ((two_r == s) & (q & 1))
+            elif tc2:
                 q += 1
-        elif not tc1 and tc2:
-            q += 1
 
-        assert q >= 0
-        assert q <= 9
-        d.append(q) # d = 10 * d + q
-        k -= 1
+            assert q >= 0
+            assert q <= 9
+            d.append(48 + q) # d = 10 * d + q
+            k -= 1
 
-        if tc1 or tc2:
-            break
+            if tc1 or tc2:
+                break
+    else:
+        while True:
+            assert r > 0
+
+            r, mp = r * 10, mp * 10
+            mm = mp if boundsEqual else mm * 10
+            q, r = divmod(r, s)
+            assert q <= 9
+
+            tc1 = r < mm
+            tc2 = r + mp > s
 
-    return d, k # result = d * 10^k
+            if tc1 and tc2:
+                two_r = r << 1
+                q += (two_r > s) | ((two_r == s) & (q & 1))
+            elif tc2:
+                q += 1
+
+            assert q >= 0
+            assert q <= 9
+            d.append(48 + q) # d = 10 * d + q
+            k -= 1
+
+            if tc1 or tc2:
+                break
+
+    return bytes(d), k # result = d * 10^k
 
 def ShortestDecimalStringFromBinary(f, e, p):
     d, k = BurgerDybvig(f, e)
-    return ''.join(map(str, d)), k
+    return d.decode('ascii'), k
 
 def ShortestDecimalFromBinary(f, e, p):
     d, k = BurgerDybvig(f, e)
-    return int(''.join(map(str, d))), k
+    return int(d), k
 
 #===================================================================================================
 #
 #===================================================================================================
 
-#def Dtoa(v):
-#    f, e, p, isExact = BinaryFromFloat(v)
-#    return ShortestDecimalStringFromBinary(f, e, p)
+def Dtoa(v):
+    f, e, p, isExact = BinaryFromFloat(v)
+    return ShortestDecimalStringFromBinary(f, e, p)
 
 #assert Dtoa(1.0) == ('1', 0)
 #assert Dtoa(1.5) == ('15', -1)
@@ -268,20 +341,27 @@ def ShortestDecimalFromBinary(f, e, p):
 #assert Dtoa(3299624351.9916105) == ('32996243519916105', -7)
 #assert Dtoa(1.3802575018809038) == ('13802575018809038', -16)
 
-#def DtoaPow2(e, significand):
-#    if e >= 0:
-#        num = 2**e * significand
-#        den = 1
-#    else:
-#        num = 1 * significand
-#        den = 2**(-e)
-#    f, e, p, isExact = BinaryFromFraction(num, den)
-#    return ShortestDecimalStringFromBinary(f, e, p)
-
-#for e in range(MIN_EXPONENT, MAX_EXPONENT + 1):
-#    DtoaPow2(e, 1)
-#    DtoaPow2(e, 2**53 - 1)
-#    # print "e = {:4d} {}".format(e, DtoaPow2(e))
+def DtoaPow2(e, significand):
+    if e >= 0:
+        num = significand << e
+        den = 1
+    else:
+        num = 1 * significand
+        den = 1 << -e
+    f, e, p, isExact = BinaryFromFraction(num, den)
+    return ShortestDecimalStringFromBinary(f, e, p)
+
+def CheckPow2(e):
+    DtoaPow2(e, 1)
+    DtoaPow2(e, (1 << 53) - 1)
+    # print("e = {:4d} {}".format(e, DtoaPow2(e, 1)))
+
+def SelfTestPow2():
+    # The sweep is embarrassingly parallel across exponents; run one worker
+    # per core. Invoke with --selftest.
+    with concurrent.futures.ProcessPoolExecutor() as ex:
+        for _ in ex.map(CheckPow2, range(MIN_EXPONENT, MAX_EXPONENT + 1), chunksize=64):
+            pass
 
 # for i in range(0, 1000000 + 1):
 #     val = random.uniform(1.0, 2.0)
@@ -327,7 +407,10 @@ def TestDecimalString(s):
     print("")
     PrintBinary(*BinaryFromDecimalString(s))
 
-TestDecimalString('0.11754943e-37')
+if __name__ == '__main__':
+    TestDecimalString('0.11754943e-37')
+    if '--selftest' in sys.argv[1:]:
+        SelfTestPow2()
 
 # TestDecimalString('12345678e-7')
 # TestDecimalString('12345677999999999929769955997471697628498077392578125e-52')
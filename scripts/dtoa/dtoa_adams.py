@@ -9,6 +9,11 @@ BIAS = 2**(EXPONENT_BITS - 1) - 1 + (PRECISION - 1)
 MIN_EXPONENT = 1 - BIAS
 MAX_EXPONENT = 2**EXPONENT_BITS - 2 - BIAS
 
+# Powers of 2 and 5 for the valid binary exponent range (plus some slack),
+# computed once at module load.
+POW2 = tuple(1 << i for i in range(1100))
+POW5 = tuple(5**i for i in range(1100))
+
 #===================================================================================================
 # Dtoa
 #===================================================================================================
@@ -41,14 +46,16 @@ def DtoaAdams(m2, e2):
 
     if e2 >= 0:
         e10 = 0
-        a = u * 2**e2
-        b = v * 2**e2
-        c = w * 2**e2
+        pow2 = POW2[e2]
+        a = u * pow2
+        b = v * pow2
+        c = w * pow2
     else:
         e10 = e2
-        a = u * 5**(-e2)
-        b = v * 5**(-e2)
-        c = w * 5**(-e2)
+        pow5 = POW5[-e2]
+        a = u * pow5
+        b = v * pow5
+        c = w * pow5
 
     assert a < c - 1
     # print 'a = {}'.format(a)
@@ -68,13 +75,12 @@ def DtoaAdams(m2, e2):
     atz = True # a[0],...,a[i] are 0s
     btz = True # b[0],...,b[i-1] are 0s
     bi = 0
-    while a / 10 < c / 10:
+    while a // 10 < c // 10:
         atz = atz and a % 10 == 0
         btz = btz and bi == 0
-        bi = b % 10
-        a /= 10
-        b /= 10
-        c /= 10
+        b, bi = divmod(b, 10)
+        a //= 10
+        c //= 10
         e10 += 1
         # print '--- a/10 < c/10 ---'
         # print 'atz = {}'.format(atz)
@@ -87,10 +93,9 @@ def DtoaAdams(m2, e2):
     if acceptSmaller and atz:
         while a % 10 == 0:
             btz = btz and bi == 0
-            bi = b % 10
-            a /= 10
-            b /= 10
-            c /= 10
+            b, bi = divmod(b, 10)
+            a //= 10
+            c //= 10
             e10 += 1
             # print '--- a%10 == 0 ---'
             # print 'atz = {}'.format(atz)
@@ -1,3 +1,10 @@
+try:
+    # GMP bignums are significantly faster than Python ints for the
+    # multi-hundred-bit operands produced by subnormal inputs.
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
 PRECISION = 53
 EXPONENT_BITS = 11
 
@@ -9,6 +16,17 @@ BIAS = 2**(EXPONENT_BITS - 1) - 1 + (PRECISION - 1)
 MIN_EXPONENT = 1 - BIAS
 MAX_EXPONENT = 2**EXPONENT_BITS - 2 - BIAS
 
+# Powers of 10 shared across all DtoaBurgerDybvig calls. The scaling step only
+# needs |k| <= ceil(log_10(2^1075)) or so; 800 covers all supported formats.
+POW10 = tuple(mpz(10)**i for i in range(800))
+
+# Powers of 2 for the valid binary exponent range (plus some slack).
+POW2 = tuple(mpz(1) << i for i in range(2200))
+
+def Pow10(k):
+    assert k >= 0
+    return POW10[k] if k < len(POW10) else mpz(10)**k
+
 #===================================================================================================
 # Dtoa
 #===================================================================================================
@@ -21,25 +39,23 @@ def EffectivePrecision(f):
     """Returns the effective precision of the significand, aka. f.bit_length()"""
 
     assert f > 0
-    assert f < 2**PRECISION
+    assert f < 1 << PRECISION
 
-    p = PRECISION
-    while f < 2**(PRECISION - 1):
-        f *= 2
-        p -= 1
+    return f.bit_length()
 
-    return p
+# ceil(log_10(2^e)) for e in [-1650, 1650], computed once at module load.
+CEIL_LOG10_POW2 = tuple((e * 78913 + (2**18 - 1)) >> 18 for e in range(-1650, 1650 + 1))
 
 def CeilLog10Pow2(e):
     """Returns ceil(log_10(2^e))"""
 
     assert e >= -1650
     assert e <=  1650
-    return (int(e) * 78913 + (2**18 - 1)) // 2**18 # floor-division (SAR)
+    return CEIL_LOG10_POW2[e + 1650]
 
 def DtoaBurgerDybvig(f, e):
     assert f > 0
-    assert f < 2**PRECISION
+    assert f < 1 << PRECISION
     assert e >= MIN_EXPONENT
     assert e <= MAX_EXPONENT
 
@@ -52,14 +68,24 @@ def DtoaBurgerDybvig(f, e):
     lowerBoundaryIsCloser = (f == HIDDEN_BIT and e != MIN_EXPONENT)
 
     if e >= 0:
-        r, s, mp, mm = f * 2 * 2**e, 2, 2**e, 2**e
+        pow2 = POW2[e]
+        r, s, mp, mm = f * 2 * pow2, 2, pow2, pow2
     else:
-        r, s, mp, mm = f * 2, 2**(-e) * 2, 1, 1
+        r, s, mp, mm = f * 2, POW2[-e] * 2, 1, 1
+
+    # Promoting to GMP integers only pays off once the operands are wide;
+    # keep native ints on the small-operand path.
+    if mpz is not int and (r | s).bit_length() > 64:
+        r, s, mp, mm = mpz(r), mpz(s), mpz(mp), mpz(mm)
 
     # Could do after scaling to keep the numbers a tiny bit smaller?!?!
     if lowerBoundaryIsCloser:
         r, s, mp = r * 2, s * 2, mp * 2
 
+    # Unless the lower boundary is closer, m- stays equal to m+ through the
+    # scaling and digit loops; share one multiplication for both.
+    boundsEqual = not lowerBoundaryIsCloser
+
     #
     # Scale into the range [0.1, 1.0)
     #   aka: Find the smallest integer k, such that (r + m+) / s <= 10^k
@@ -81,11 +107,12 @@ def DtoaBurgerDybvig(f, e):
         p = EffectivePrecision(f)
 
         # Estimate:
-        k = CeilLog10Pow2(e + (p - 1))
+        k = CEIL_LOG10_POW2[(e + (p - 1)) + 1650] # CeilLog10Pow2, inlined
         if k >= 0:
-            s *= 10**k
+            s *= Pow10(k)
         else:
-            r, mp, mm = r * 10**(-k), mp * 10**(-k), mm * 10**(-k)
+            scale = Pow10(-k)
+            r, mp, mm = r * scale, mp * scale, mm * scale
 
         # Fixup:
         if (r + mp >= s) if acceptBounds else (r + mp > s):
@@ -98,11 +125,12 @@ def DtoaBurgerDybvig(f, e):
     # Generate
     #
 
-    d = []
+    d = 0
     while True:
         assert r > 0
 
-        r, mp, mm = r * 10, mp * 10, mm * 10
+        r, mp = r * 10, mp * 10
+        mm = mp if boundsEqual else mm * 10
         q, r = divmod(r, s)
         assert q <= 9
 
@@ -119,10 +147,10 @@ def DtoaBurgerDybvig(f, e):
 
         assert q >= 0
         assert q <= 9
-        d.append(q) # d = 10 * d + q
+        d = 10 * d + q
         k -= 1
 
         if tc1 or tc2:
             break
 
-    return long(''.join(map(str, d))), k
+    return int(d), k
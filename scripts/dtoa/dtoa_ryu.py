@@ -13,10 +13,15 @@ MAX_EXPONENT = 2**EXPONENT_BITS - 2 - BIAS
 # Dtoa
 #===================================================================================================
 
+# The floor-log helpers are called from the table generators and DtoaRyu's
+# exponent classification; precompute them over their valid ranges so each
+# call is a tuple lookup.
+FLOOR_LOG2_POW5 = tuple((e * 38955489) >> 24 for e in range(-12654, 12654 + 1))
+
 def FloorLog2Pow5(e):
     assert e >= -12654
     assert e <=  12654
-    return (e * 38955489) >> 24
+    return FLOOR_LOG2_POW5[e + 12654]
 
 def Ceil(num, den):
     assert num >= 0
@@ -26,18 +31,29 @@ def Ceil(num, den):
         q += 1
     return q
 
+# Powers of 5 for the cached-power range, built incrementally once at module
+# load instead of re-exponentiating on every ComputePow5 call.
+POW5 = [1]
+for _ in range(400):
+    POW5.append(POW5[-1] * 5)
+POW5 = tuple(POW5)
+
+def Pow5(k):
+    assert k >= 0
+    return POW5[k] if k < len(POW5) else 5**k
+
 def ComputePow5(k, bits = 128):
     assert bits > 0
     e = FloorLog2Pow5(k) + 1 - bits
     if k >= 0:
         if e > 0:
-            f = 5**k // 2**e
+            f = Pow5(k) >> e
         else:
-            f = 5**k * 2**(-e)
+            f = Pow5(k) << -e
     else:
-        f = Ceil(2**(-e), 5**(-k))
-    assert f >= 2**(bits - 1)
-    assert f < 2**bits
+        f = Ceil(1 << -e, Pow5(-k))
+    assert f >= 1 << (bits - 1)
+    assert f < 1 << bits
     return f
 
 #---------------------------------------------------------------------------------------------------
@@ -47,17 +63,66 @@ def ComputePow5(k, bits = 128):
 CachedPow5Bits = 128
 CachedPow5MinDecExp = -290
 CachedPow5MaxDecExp =  325
-CachedPow5 = [ComputePow5(k, bits=CachedPow5Bits) for k in range(CachedPow5MinDecExp, CachedPow5MaxDecExp + 1)]
+
+def ComputeCachedPow5(min_k, max_k, bits):
+    """Returns [ComputePow5(k, bits) for k in range(min_k, max_k + 1)], built
+    with one running product per sweep direction instead of a fresh
+    exponentiation per entry."""
+
+    table = {}
+    # k >= 0: floor(5^k / 2^e) resp. 5^k * 2^-e
+    f5 = 1
+    for k in range(0, max_k + 1):
+        e = FloorLog2Pow5(k) + 1 - bits
+        table[k] = (f5 >> e) if e > 0 else (f5 << -e)
+        f5 *= 5
+    # k < 0: ceil(2^-e / 5^-k)
+    den = 1
+    for k in range(-1, min_k - 1, -1):
+        den *= 5
+        e = FloorLog2Pow5(k) + 1 - bits
+        q, r = divmod(1 << -e, den)
+        table[k] = q + (r > 0)
+    return [table[k] for k in range(min_k, max_k + 1)]
+
+def LoadCachedPow5(min_k, max_k, bits):
+    """Loads the cached-power table from a pickle next to this script, or
+    recomputes it (and tries to store it) on a miss."""
+
+    import os.path
+    import pickle
+
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cached_pow5.pkl')
+    key = (min_k, max_k, bits)
+    try:
+        with open(filename, 'rb') as f:
+            stored_key, table = pickle.load(f)
+        if stored_key == key:
+            return table
+    except (IOError, OSError, pickle.PickleError, ValueError, EOFError):
+        pass
+    table = ComputeCachedPow5(min_k, max_k, bits)
+    try:
+        with open(filename, 'wb') as f:
+            pickle.dump((key, table), f)
+    except (IOError, OSError):
+        pass # e.g. read-only checkout; recompute next time
+    return table
+
+CachedPow5 = LoadCachedPow5(CachedPow5MinDecExp, CachedPow5MaxDecExp, CachedPow5Bits)
+
+FLOOR_LOG10_POW2 = tuple((e * 315653) >> 20 for e in range(-2620, 2620 + 1))
+FLOOR_LOG10_POW5 = tuple((e * 732923) >> 20 for e in range(-2620, 2620 + 1))
 
 def FloorLog10Pow2(e):
     assert e >= -2620
     assert e <=  2620
-    return (e * 315653) >> 20
+    return FLOOR_LOG10_POW2[e + 2620]
 
 def FloorLog10Pow5(e):
     assert e >= -2620
     assert e <=  2620
-    return (e * 732923) >> 20
+    return FLOOR_LOG10_POW5[e + 2620]
 
 def MulShift(x, y, j):
     assert x >= 0
@@ -68,31 +133,33 @@ def MulShift(x, y, j):
 def MulPow5DivPow2(u, v, w, e5, e2):
     assert e5 >= CachedPow5MinDecExp
     assert e5 <= CachedPow5MaxDecExp
-    k = FloorLog2Pow5(e5) + 1 - CachedPow5Bits
+    k = FLOOR_LOG2_POW5[e5 + 12654] + 1 - CachedPow5Bits # FloorLog2Pow5, inlined
     j = e2 - k
+    assert j >= 0
 #   pow5 = ComputePow5(e5)
     pow5 = CachedPow5[e5 - CachedPow5MinDecExp]
-    a = MulShift(u, pow5, j)
-    b = MulShift(v, pow5, j)
-    c = MulShift(w, pow5, j)
-    return a, b, c
+    # MulShift, inlined for all three products.
+    return (u * pow5) >> j, (v * pow5) >> j, (w * pow5) >> j
+
+MASK64 = (1 << 64) - 1
+
+# (inverse of 5^e mod 2^64, floor((2^64 - 1) / 5^e)) for the e5 range reachable
+# with double-precision inputs. x in [0, 2^64) is a multiple of 5^e iff
+# x * inverse mod 2^64 <= bound (Granlund-Montgomery invariant divisors).
+Pow5Inv = tuple((pow(5**e, -1, 1 << 64), MASK64 // 5**e) for e in range(23))
 
 def MultipleOfPow5(value, e5):
     if e5 <= 0:
         return True
-    return value % 5**e5 == 0
-    # while e5 > 0:
-    #     q, r = divmod(value, 5)
-    #     if r != 0:
-    #         return False
-    #     value = q
-    #     e5 -= 1
-    # return True
+    if e5 < len(Pow5Inv) and value <= MASK64:
+        inv, bound = Pow5Inv[e5]
+        return ((value * inv) & MASK64) <= bound
+    return value % Pow5(e5) == 0
 
 def MultipleOfPow2(value, e2):
     if e2 <= 0:
         return True
-    return value % 2**e2 == 0
+    return (value & ((1 << e2) - 1)) == 0
 
 def DtoaRyu(m2, e2):
     isEven = (m2 % 2 == 0)
@@ -127,7 +194,7 @@ def DtoaRyu(m2, e2):
     # Since acceptLower == acceptUpper, we only need to know one or the other.
 
     if e2 >= 0:
-        q_prime = FloorLog10Pow2(e2)
+        q_prime = FLOOR_LOG10_POW2[e2 + 2620] # FloorLog10Pow2, inlined
         q = max(0, q_prime - 1)
         e10 = q
 
@@ -157,7 +224,7 @@ def DtoaRyu(m2, e2):
             else:
                 ctz = MultipleOfPow5(w, q)
     else:
-        q_prime = FloorLog10Pow5(-e2)
+        q_prime = FLOOR_LOG10_POW5[-e2 + 2620] # FloorLog10Pow5, inlined
         q = max(0, q_prime - 1)
         e10 = q + e2
 
@@ -213,39 +280,49 @@ def DtoaRyu(m2, e2):
 
     # If q_prime == 0, then bi = 0.
     # Otherwise we need to execute the loop at least once to assign a valid value bi.
-    assert (q_prime == 0) or (a / 10 < c / 10)
+    assert (q_prime == 0) or (a // 10 < c // 10)
+
+    # Strip trailing digits in chunks of 8, 4, 2, 1. Floor division is
+    # monotone, so a // 10^n < c // 10^n implies a // 10^i < c // 10^i for all
+    # i <= n, i.e. the per-digit loop condition holds at every step inside the
+    # chunk. After a chunk of n digits, bi is the most significant of the n
+    # stripped digits of b and btz additionally requires the other n-1 to be 0.
+    STRIP_CHUNKS = ((8, 10**8), (4, 10**4), (2, 10**2), (1, 10))
 
     if atz or btz:
-        while a / 10 < c / 10:
-            atz = atz and a % 10 == 0
-            btz = btz and bi == 0
-            bi = b % 10
-            a /= 10
-            b /= 10
-            c /= 10
-            e10 += 1
+        for n, p in STRIP_CHUNKS:
+            while a // p < c // p:
+                atz = atz and a % p == 0
+                btz = btz and bi == 0 and b % (p // 10) == 0
+                a //= p
+                b, bi = divmod(b, p)
+                bi //= p // 10
+                c //= p
+                e10 += n
         # if acceptBounds and atz:
         #
         # Since we only assign to atz iff acceptBounds == true, and atz is
         # initialized to false, the test may be simplified here.
         if atz:
-            while a % 10 == 0:
-                btz = btz and bi == 0
-                bi = b % 10
-                a /= 10
-                b /= 10
-                c /= 10
-                e10 += 1
+            for n, p in STRIP_CHUNKS:
+                while a % p == 0:
+                    btz = btz and bi == 0 and b % (p // 10) == 0
+                    a //= p
+                    b, bi = divmod(b, p)
+                    bi //= p // 10
+                    c //= p
+                    e10 += n
 
         roundDown = bi < 5 or (bi == 5 and btz and b % 2 == 0)
     else:
         roundDown = True
-        while a / 10 < c / 10:
-            roundDown = (b % 10 < 5)
-            a /= 10
-            b /= 10
-            c /= 10
-            e10 += 1
+        for n, p in STRIP_CHUNKS:
+            while a // p < c // p:
+                a //= p
+                b, bi = divmod(b, p)
+                c //= p
+                e10 += n
+                roundDown = (bi // (p // 10) < 5)
 
     # A return value of b is valid if and only if a != b or atz is true.
     # A return value of b + 1 is valid if and only if b + 1 <= c.
@@ -2,43 +2,22 @@
 #
 #===============================================================================
 
-# def Sum(chunks, bits_per_chunk):
-#     assert bits_per_chunk > 0
-#     return sum( map(lambda (i, c): c * (2**bits_per_chunk)**i, enumerate(chunks)) )
-
-def Split(n, bits_per_chunk):
-    assert n >= 0
-    assert bits_per_chunk > 0
-    chunks = []
-    while True:
-        n, r = divmod(n, 2**bits_per_chunk)
-        chunks.append(r)
-        if n == 0:
-            break
-    return chunks
-
-def ToHexString(n, bits):
-    assert bits > 0
-    p = (bits + (4 - 1)) // 4       # Round up to four bits per hexit
-#   p = 2**((p - 1).bit_length())   # Round up to next power-of-2
-    assert 4*p >= n.bit_length()
-    return('0x{:0{}X}'.format(n, p))
-
-def FormatHexChunks(n, bits_per_chunk = 64):
-    chunks = Split(n, bits_per_chunk)
-    s = ', '.join(map(lambda x: ToHexString(x, bits_per_chunk), reversed(chunks)))
-    if len(chunks) > 1:
-        s = '{' + s + '}'
-    return s
+import os.path
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from powers_common import FormatHexChunks
 
 #===============================================================================
 # Grisu
 #===============================================================================
 
+FLOOR_LOG2_POW10 = tuple((e * 1741647) >> 19 for e in range(-1233, 1232 + 1))
+
 def FloorLog2Pow10(e):
     assert e >= -1233
     assert e <= 1232
-    return (e * 1741647) >> 19
+    return FLOOR_LOG2_POW10[e + 1233]
 
 def RoundUp(num, den):
     assert num >= 0
@@ -48,27 +27,42 @@ def RoundUp(num, den):
         p += 1
     return p
 
+# Powers of 10 for the cached-power range, built incrementally once at module
+# load instead of re-exponentiating on every ComputeGrisuPower call.
+POW10 = [1]
+for _ in range(400):
+    POW10.append(POW10[-1] * 10)
+POW10 = tuple(POW10)
+
+def Pow10(k):
+    assert k >= 0
+    return POW10[k] if k < len(POW10) else 10**k
+
 def ComputeGrisuPower(k, bits):
     assert bits > 0
     e = FloorLog2Pow10(k) + 1 - bits
     if k >= 0:
         if e > 0:
-            f = RoundUp(10**k, 2**e)
+            # round_up(10^k / 2^e) as a pure shift
+            f = (Pow10(k) + (1 << (e - 1))) >> e
         else:
-            f = 10**k * 2**(-e)
+            f = Pow10(k) << -e
     else:
-        f = RoundUp(2**(-e), 10**(-k))
-    assert f >= 2**(bits - 1)
-    assert f < 2**bits
+        f = RoundUp(1 << -e, Pow10(-k))
+    assert f >= 1 << (bits - 1)
+    assert f < 1 << bits
     return f, e
 
 def PrintGrisuPowers(bits, min_exponent, max_exponent, step = 1):
-    print('// Let e = FloorLog2Pow10(k) + 1 - {}'.format(bits))
-    print('// For k >= 0, stores 10^k in the form: round_up(10^k / 2^e )')
-    print('// For k <= 0, stores 10^k in the form: round_up(2^-e / 10^-k)')
+    # Buffer the table and emit it with a single write.
+    out = []
+    out.append(f'// Let e = FloorLog2Pow10(k) + 1 - {bits}')
+    out.append('// For k >= 0, stores 10^k in the form: round_up(10^k / 2^e )')
+    out.append('// For k <= 0, stores 10^k in the form: round_up(2^-e / 10^-k)')
     for k in range(min_exponent, max_exponent + 1, step):
         f, e = ComputeGrisuPower(k, bits)
-        print(FormatHexChunks(f, bits_per_chunk=64) + ', // e = {:5d}, k = {:4d}'.format(e, k))
+        out.append(FormatHexChunks(f, bits_per_chunk=64) + f', // e = {e:5d}, k = {k:4d}')
+    print('\n'.join(out))
 
 # For double-precision:
 # PrintGrisuPowers(bits=64, min_exponent=-300, max_exponent=324, step=8)
@@ -82,7 +76,7 @@ def DivUp(num, den):
 def CeilLog10Pow2(e):
     assert e >= -2620
     assert e <=  2620
-    return (e * 315653 + (2**20 - 1)) >> 20;
+    return (e * 315653 + ((1 << 20) - 1)) >> 20;
 
 def FloorLog10Pow2(e):
     assert e >= -2620
@@ -91,11 +85,17 @@ def FloorLog10Pow2(e):
 
 def ComputeBinaryExponentRange(q, p, exponent_bits):
     assert 0 <= p and p + 3 <= q
-    bias = 2**(exponent_bits - 1) - 1
-    min_exp = (1                    - bias) - (p - 1) - (p - 1) - (q - p)
-    max_exp = (2**exponent_bits - 2 - bias) - (p - 1)           - (q - p)
+    bias = (1 << (exponent_bits - 1)) - 1
+    min_exp = (1                        - bias) - (p - 1) - (p - 1) - (q - p)
+    max_exp = ((1 << exponent_bits) - 2 - bias) - (p - 1)           - (q - p)
     return min_exp, max_exp
 
+# (e_min, e_max) for the supported configurations, computed once at import.
+_RANGE_CACHE = {
+    (64, 53, 11): ComputeBinaryExponentRange(64, 53, 11), # DiyFp q=64, IEEE double
+    (32, 24,  8): ComputeBinaryExponentRange(32, 24,  8), # DiyFp q=32, IEEE single
+}
+
 def PrintGrisuPowersForExponentRange(alpha, gamma, q = 64, p = 53, exponent_bits = 11):
     assert alpha + 3 <= gamma
 
@@ -103,7 +103,10 @@ def PrintGrisuPowersForExponentRange(alpha, gamma, q = 64, p = 53, exponent_bits
     # For IEEE double-precision p = 53, exponent_bits = 11
     # e_min, e_max = ComputeBinaryExponentRange(q=64, p=53, exponent_bits=11)
     # e_min, e_max = ComputeBinaryExponentRange(q=32, p=24, exponent_bits=8)
-    e_min, e_max = ComputeBinaryExponentRange(q, p, exponent_bits)
+    if (q, p, exponent_bits) in _RANGE_CACHE:
+        e_min, e_max = _RANGE_CACHE[(q, p, exponent_bits)]
+    else:
+        e_min, e_max = ComputeBinaryExponentRange(q, p, exponent_bits)
 
     k_del = max(1, FloorLog10Pow2(gamma - alpha))
     # k_del = 1
@@ -116,18 +119,21 @@ def PrintGrisuPowersForExponentRange(alpha, gamma, q = 64, p = 53, exponent_bits
     k_min_cached = k_min;
     k_max_cached = k_min + k_del * (num_cached - 1)
 
-    print('constexpr int kAlpha = {:3d};'.format(alpha))
-    print('constexpr int kGamma = {:3d};'.format(gamma))
-    print('// k_min = {:4d}'.format(k_min))
-    print('// k_max = {:4d}'.format(k_max))
-#   print('// k_del = {:4d}'.format(k_del))
-#   print('// k_min (max) = {}'.format(k_min + (k_del - 1)))
-    print('')
-    print('constexpr int kCachedPowersSize       = {:>4d};'.format(num_cached))
-    print('constexpr int kCachedPowersMinDecExp  = {:>4d};'.format(k_min_cached))
-    print('constexpr int kCachedPowersMaxDecExp  = {:>4d};'.format(k_max_cached))
-    print('constexpr int kCachedPowersDecExpStep = {:>4d};'.format(k_del))
-    print('')
+    # Buffer the generated code and emit it with a single write.
+    out = []
+
+    out.append('constexpr int kAlpha = {:3d};'.format(alpha))
+    out.append('constexpr int kGamma = {:3d};'.format(gamma))
+    out.append('// k_min = {:4d}'.format(k_min))
+    out.append('// k_max = {:4d}'.format(k_max))
+#   out.append('// k_del = {:4d}'.format(k_del))
+#   out.append('// k_min (max) = {}'.format(k_min + (k_del - 1)))
+    out.append('')
+    out.append('constexpr int kCachedPowersSize       = {:>4d};'.format(num_cached))
+    out.append('constexpr int kCachedPowersMinDecExp  = {:>4d};'.format(k_min_cached))
+    out.append('constexpr int kCachedPowersMaxDecExp  = {:>4d};'.format(k_max_cached))
+    out.append('constexpr int kCachedPowersDecExpStep = {:>4d};'.format(k_del))
+    out.append('')
 
     # print('inline CachedPower GetCachedPower(int index)')
     # print('{')
@@ -146,39 +152,41 @@ def PrintGrisuPowersForExponentRange(alpha, gamma, q = 64, p = 53, exponent_bits
     # print('    return {kSignificands[index], e, k};')
     # print('}')
 
-    print('// For a normalized DiyFp w = f * 2^e, this function returns a (normalized)')
-    print('// cached power-of-ten c = f_c * 2^e_c, such that the exponent of the product')
-    print('// w * c satisfies')
-    print('//')
-    print('//      kAlpha <= e_c + e + q <= kGamma.')
-    print('//')
-    print('inline CachedPower GetCachedPowerForBinaryExponent(int e)')
-    print('{')
-    print('    static constexpr uint{}_t kSignificands[] = {{'.format(q))
+    out.append('// For a normalized DiyFp w = f * 2^e, this function returns a (normalized)')
+    out.append('// cached power-of-ten c = f_c * 2^e_c, such that the exponent of the product')
+    out.append('// w * c satisfies')
+    out.append('//')
+    out.append('//      kAlpha <= e_c + e + q <= kGamma.')
+    out.append('//')
+    out.append('inline CachedPower GetCachedPowerForBinaryExponent(int e)')
+    out.append('{')
+    out.append('    static constexpr uint{}_t kSignificands[] = {{'.format(q))
     for k in range(k_min_cached, k_max_cached + 1, k_del):
         f, e = ComputeGrisuPower(k, q)
-        print('        ' + FormatHexChunks(f, q) + ', // e = {:5d}, k = {:4d}'.format(e, k))
-    print('    };')
-    print('')
-    print('    GRISU_ASSERT(e >= {:>5d});'.format(e_min))
-    print('    GRISU_ASSERT(e <= {:>5d});'.format(e_max))
-    print('')
-    print('    const int k = CeilLog10Pow2(kAlpha - e - 1);')
-    print('    GRISU_ASSERT(k >= kCachedPowersMinDecExp - (kCachedPowersDecExpStep - 1));')
-    print('    GRISU_ASSERT(k <= kCachedPowersMaxDecExp);')
-    print('')
-    print('    const unsigned index = static_cast<unsigned>(k - (kCachedPowersMinDecExp - (kCachedPowersDecExpStep - 1))) / kCachedPowersDecExpStep;')
-    print('    GRISU_ASSERT(index < kCachedPowersSize);')
-    print('')
-    print('    const int k_cached = kCachedPowersMinDecExp + static_cast<int>(index) * kCachedPowersDecExpStep;')
-    print('    const int e_cached = FloorLog2Pow10(k_cached) + 1 - {};'.format(q))
-    print('')
-    print('    const CachedPower cached = {kSignificands[index], e_cached, k_cached};')
-    print('    GRISU_ASSERT(kAlpha <= cached.e + e + {});'.format(q))
-    print('    GRISU_ASSERT(kGamma >= cached.e + e + {});'.format(q))
-    print('')
-    print('    return cached;')
-    print('}')
+        out.append('        ' + FormatHexChunks(f, q) + f', // e = {e:5d}, k = {k:4d}')
+    out.append('    };')
+    out.append('')
+    out.append('    GRISU_ASSERT(e >= {:>5d});'.format(e_min))
+    out.append('    GRISU_ASSERT(e <= {:>5d});'.format(e_max))
+    out.append('')
+    out.append('    const int k = CeilLog10Pow2(kAlpha - e - 1);')
+    out.append('    GRISU_ASSERT(k >= kCachedPowersMinDecExp - (kCachedPowersDecExpStep - 1));')
+    out.append('    GRISU_ASSERT(k <= kCachedPowersMaxDecExp);')
+    out.append('')
+    out.append('    const unsigned index = static_cast<unsigned>(k - (kCachedPowersMinDecExp - (kCachedPowersDecExpStep - 1))) / kCachedPowersDecExpStep;')
+    out.append('    GRISU_ASSERT(index < kCachedPowersSize);')
+    out.append('')
+    out.append('    const int k_cached = kCachedPowersMinDecExp + static_cast<int>(index) * kCachedPowersDecExpStep;')
+    out.append('    const int e_cached = FloorLog2Pow10(k_cached) + 1 - {};'.format(q))
+    out.append('')
+    out.append('    const CachedPower cached = {kSignificands[index], e_cached, k_cached};')
+    out.append('    GRISU_ASSERT(kAlpha <= cached.e + e + {});'.format(q))
+    out.append('    GRISU_ASSERT(kGamma >= cached.e + e + {});'.format(q))
+    out.append('')
+    out.append('    return cached;')
+    out.append('}')
+
+    print('\n'.join(out))
 
 # PrintGrisuPowersForExponentRange(-60, -32, q=64, p=53, exponent_bits=11)
 # PrintGrisuPowersForExponentRange(-59, -32, q=64, p=53, exponent_bits=11)
@@ -1,9 +1,13 @@
 def ExtendedGCD(a, b):
-    if a == 0:
-        return b, 0, 1
-    else:
-        g, y, x = ExtendedGCD(b % a, a)
-        return g, x - (b // a) * y, y
+    # Iterative to avoid one level of recursion per quotient step.
+    x0, x1 = 0, 1
+    y0, y1 = 1, 0
+    while a != 0:
+        q, r = divmod(b, a)
+        b, a = a, r
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return b, x0, y0
 
 def ModularInverse(a, m):
     assert a >= 0
@@ -14,17 +18,20 @@ def ModularInverse(a, m):
 
 def PrintTable(base, max_exp, bits):
     assert bits % 4 == 0
-    print('{{0x{:0{}X}u, 0x{:0{}X}u}}, // {}^{}'.format(1, bits // 4, 2**bits - 1, bits // 4, base, 0))
+    m2 = 1 << bits
+    w = bits // 4
+    out = [f'{{0x{1:0{w}X}u, 0x{m2 - 1:0{w}X}u}}, // {base}^0']
     e = 1
     while True:
         a = base**e
-        if a >= 2**bits:
+        if a >= m2:
             break
-        m = ModularInverse(a, 2**bits)
-        assert (a * m) % 2**bits == 1
-        print('{{0x{:0{}X}u, 0x{:0{}X}u}}, // {}^{}'.format(m, bits // 4, 2**bits // a, bits // 4, base, e))
+        m = ModularInverse(a, m2)
+        assert (a * m) % m2 == 1
+        out.append(f'{{0x{m:0{w}X}u, 0x{m2 // a:0{w}X}u}}, // {base}^{e}')
         e += 1
-    print('')
+    out.append('')
+    print('\n'.join(out))
 
 PrintTable(base=5, max_exp=10, bits=32) # 10 = floor(log_5(2^26))
 PrintTable(base=5, max_exp=22, bits=64) # 22 = floor(log_5(2^55))
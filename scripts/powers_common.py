@@ -0,0 +1,51 @@
+#===============================================================================
+# Helpers shared by the grisu and ryu table generators for formatting
+# significands as C array initializers. The generators only differ in the
+# integer-literal suffix they emit ('' vs. 'u').
+#===============================================================================
+
+# def Sum(chunks, bits_per_chunk):
+#     assert bits_per_chunk > 0
+#     return sum( map(lambda (i, c): c * (2**bits_per_chunk)**i, enumerate(chunks)) )
+
+def Split(n, bits_per_chunk):
+    assert n >= 0
+    assert bits_per_chunk > 0
+    mask = (1 << bits_per_chunk) - 1
+    chunks = []
+    while True:
+        chunks.append(n & mask)
+        n >>= bits_per_chunk
+        if n == 0:
+            break
+    return chunks
+
+def ToHexString(n, bits, suffix = ''):
+    assert bits > 0
+    p = (bits + (4 - 1)) // 4       # Round up to four bits per hexit
+#   p = 2**((p - 1).bit_length())   # Round up to next power-of-2
+    assert 4*p >= n.bit_length()
+    return '0x{:0{}X}'.format(n, p) + suffix
+
+def FormatHexChunks(n, bits_per_chunk = 64, suffix = ''):
+    # Fast paths for the common 64- and 128-bit significands.
+    if bits_per_chunk == 64:
+        if n < (1 << 64):
+            return f'0x{n:016X}{suffix}'
+        if n < (1 << 128):
+            return f'{{0x{n >> 64:016X}{suffix}, 0x{n & ((1 << 64) - 1):016X}{suffix}}}'
+    if bits_per_chunk % 8 == 0:
+        # One C-level serialization of the whole bignum, then slice the hex
+        # digits per chunk, instead of one divmod + format per chunk.
+        num_chunks = max(1, (n.bit_length() + bits_per_chunk - 1) // bits_per_chunk)
+        hexits = n.to_bytes(num_chunks * (bits_per_chunk // 8), 'big').hex().upper()
+        w = bits_per_chunk // 4
+        chunks = ['0x' + hexits[i:i + w] + suffix for i in range(0, len(hexits), w)]
+        if len(chunks) > 1:
+            return '{' + ', '.join(chunks) + '}'
+        return chunks[0]
+    chunks = Split(n, bits_per_chunk)
+    s = ', '.join(map(lambda x: ToHexString(x, bits_per_chunk, suffix), reversed(chunks)))
+    if len(chunks) > 1:
+        s = '{' + s + '}'
+    return s
@@ -17,15 +17,42 @@
 
 from euclid_min_max import EuclidMin, EuclidMax
 
+try:
+    # GMP bignums are significantly faster than Python ints for the
+    # multi-thousand-bit operands of the float64/float80 runs.
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
+# Precomputed over the full valid range; the e2 sweeps below index these
+# directly instead of paying a function call per iteration.
+FLOOR_LOG10_POW2 = tuple((e * 20201781) >> 26 for e in range(-28737, 28737 + 1))
+FLOOR_LOG10_POW5 = tuple((e * 46907083) >> 26 for e in range(-28737, 28737 + 1))
+FLOOR_LOG2_POW5  = tuple((e * 38955489) >> 24 for e in range(-12654, 12654 + 1))
+
 def FloorLog10Pow2(e):
     assert e >= -28737
     assert e <=  28737
-    return (e * 20201781) >> 26
+    return FLOOR_LOG10_POW2[e + 28737]
 
 def FloorLog10Pow5(e):
     assert e >= -28737
     assert e <=  28737
-    return (e * 46907083) >> 26
+    return FLOOR_LOG10_POW5[e + 28737]
+
+def FloorLog2Pow5(e):
+    assert e >= -12654
+    assert e <=  12654
+    return FLOOR_LOG2_POW5[e + 12654]
+
+def BitLengthOfQuotient(num, den):
+    # (num // den).bit_length() without the bignum division: the quotient has
+    # num.bit_length() - den.bit_length() bits, plus one iff num >= den << k.
+    assert num >= den > 0
+    k = num.bit_length() - den.bit_length()
+    if num >= den << k:
+        k += 1
+    return k
 
 def ComputeRequiredBitSizes(exponent_bits, explicit_mantissa_bits):
     """
@@ -44,13 +71,19 @@ def ComputeRequiredBitSizes(exponent_bits, explicit_mantissa_bits):
     min_e2 = 0
     max_e2 = (2**exponent_bits - 2) - bias - explicit_mantissa_bits - 2
     b0 = 0
+    # q grows monotonically with e2, so 5^q is maintained as a running
+    # product instead of a fresh exponentiation per iteration.
+    pow5 = mpz(1)
+    pow5_q = 0
     for e2 in range(min_e2, max_e2 + 1):
-        q = max(0, FloorLog10Pow2(e2) - 1)
-        pow5 = 5**q
-        pow2 = 2**(e2 - q)
+        q = max(0, FLOOR_LOG10_POW2[e2 + 28737] - 1) # FloorLog10Pow2, inlined
+        while pow5_q < q:
+            pow5 *= 5
+            pow5_q += 1
+        pow2 = mpz(1) << (e2 - q)
         euclid_max = EuclidMax(pow2, pow5, max_w - 1)
-        bits = ((max_w * pow5 * pow2) // (pow5 - euclid_max)).bit_length()
-        reqn = bits - pow5.bit_length()
+        bits = BitLengthOfQuotient(max_w * pow5 * pow2, pow5 - euclid_max)
+        reqn = bits - (FLOOR_LOG2_POW5[q + 12654] + 1) # pow5.bit_length(), in closed form
         b0 = max(b0, reqn)
 
     #
@@ -59,13 +92,18 @@ def ComputeRequiredBitSizes(exponent_bits, explicit_mantissa_bits):
     min_e2 = 0
     max_e2 = -(1 - bias - explicit_mantissa_bits - 2)
     b1 = 0
+    # Same running product, here for the (also monotone) exponent e2 - q.
+    pow5 = mpz(1)
+    pow5_q = 0
     for e2 in range(min_e2, max_e2 + 1):
-        q = max(0, FloorLog10Pow5(e2) - 1)
-        pow5 = 5**(e2 - q)
-        pow2 = 2**q
+        q = max(0, FLOOR_LOG10_POW5[e2 + 28737] - 1) # FloorLog10Pow5, inlined
+        while pow5_q < e2 - q:
+            pow5 *= 5
+            pow5_q += 1
+        pow2 = mpz(1) << q
         euclid_min = EuclidMin(pow5, pow2, max_w - 1)
-        bits = (euclid_min // max_w).bit_length()
-        reqn = pow5.bit_length() - bits
+        bits = BitLengthOfQuotient(euclid_min, max_w) if euclid_min >= max_w else 0
+        reqn = (FLOOR_LOG2_POW5[e2 - q + 12654] + 1) - bits # pow5.bit_length(), in closed form
         b1 = max(b1, reqn)
 
     return b0, b1
@@ -2,12 +2,49 @@
 #
 #===================================================================================================
 
+import math
+
+try:
+    # GMP bignums are significantly faster than Python ints for the
+    # multi-thousand-bit powers checked in the float64/float80 runs.
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
 class LogApprox:
     def __init__(self, b = 0, B = 0, mul = 0, shift = 0):
         self.b = b
         self.B = B
         self.mul = mul
         self.shift = shift
+        # Caches for b^n and B^n. The exactness sweeps walk the exponents
+        # monotonically, so each new power costs one multiply instead of a
+        # full exponentiation.
+        self.pow_b = [mpz(1)]
+        self.pow_B = [mpz(1)]
+        self.log2_bB = None
+
+    def LogConstants(self):
+        # (log2(b), log2(B)) for the float screens, computed on first use
+        # since b and B are usually assigned after construction.
+        lbB = self.log2_bB
+        if lbB is None:
+            lbB = self.log2_bB = (math.log2(self.b), math.log2(self.B))
+        return lbB
+
+    def Powb(self, n):
+        assert n >= 0
+        cache = self.pow_b
+        while len(cache) <= n:
+            cache.append(cache[-1] * self.b)
+        return cache[n]
+
+    def PowB(self, n):
+        assert n >= 0
+        cache = self.pow_B
+        while len(cache) <= n:
+            cache.append(cache[-1] * self.B)
+        return cache[n]
 
     def FloorOverflow(self, e, min_int, max_int):
         return e * self.mul > max_int or e * self.mul < min_int
@@ -17,61 +54,93 @@ class LogApprox:
 
     def IsFloor(self, k, e):
         # b^k <= B^E < b^(k+1)
+        #
+        # Screen with float logs first: the predicate is equivalent to
+        # k*log2(b) <= e*log2(B) < (k+1)*log2(b), and when e*log2(B) is
+        # clearly inside or outside that interval the exact bignum comparison
+        # is not needed. Near a boundary, fall through to the exact test.
+        lb, lB = self.LogConstants()
+        lo = k * lb
+        hi = lo + lb
+        mid = e * lB
+        margin = 1e-9 * (1.0 + abs(lo) + abs(mid))
+        if lo + margin <= mid and mid <= hi - margin:
+            return True
+        if mid < lo - margin or mid > hi + margin:
+            return False
         x = 1
         y = 1
         if k >= 0:
-            x *= self.b**k
+            x *= self.Powb(k)
         else:
-            y *= self.b**(-k)
+            y *= self.Powb(-k)
         if e >= 0:
-            y *= self.B**e
+            y *= self.PowB(e)
         else:
-            x *= self.B**(-e)
+            x *= self.PowB(-e)
         return x <= y and y < x * self.b
 
-    def TestFloor(self, e, min_int, max_int):
-        if self.FloorOverflow(e, min_int, max_int):
-            # print "floor: Integer overflow at e = {}".format(e)
+    def TestFloor(self, e, min_int, max_int, e_mul = None):
+        # The sweeps in FindFloorApprox walk e by 1 and pass the running
+        # product e * mul, saving a multiplication per probe.
+        if e_mul is None:
+            e_mul = e * self.mul
+        if e_mul > max_int or e_mul < min_int:
+            # print("floor: Integer overflow at e = {}".format(e))
             return False
-        k = self.Floor(e)
+        k = e_mul >> self.shift
         if k < min_int or k > max_int:
-            # print "floor: Result is out of range"
+            # print("floor: Result is out of range")
             return False
         if not self.IsFloor(k, e):
-            # print "floor: test failed: k = {:6d}, b = {:3d}, B = {:3d}, e = {:6d}".format(k, self.b, self.B, e)
+            # print("floor: test failed: k = {:6d}, b = {:3d}, B = {:3d}, e = {:6d}".format(k, self.b, self.B, e))
             return False
         return True
 
     def CeilOverflow(self, e, min_int, max_int):
-        return e * self.mul + (2**self.shift - 1) > max_int or e * self.mul < min_int
+        return e * self.mul + ((1 << self.shift) - 1) > max_int or e * self.mul < min_int
 
     def Ceil(self, e):
-        return (e * self.mul + (2**self.shift - 1)) >> self.shift
+        return (e * self.mul + ((1 << self.shift) - 1)) >> self.shift
 
     def IsCeil(self, k, e):
         # b^(k-1) < B^E < b^k   <=>   b^k < B^E * b < b^k * b
+        #
+        # Same float-log screen as IsFloor, for the interval
+        # (k-1)*log2(b) < e*log2(B) <= k*log2(b).
+        lb, lB = self.LogConstants()
+        hi = k * lb
+        lo = hi - lb
+        mid = e * lB
+        margin = 1e-9 * (1.0 + abs(hi) + abs(mid))
+        if lo + margin <= mid and mid <= hi - margin:
+            return True
+        if mid < lo - margin or mid > hi + margin:
+            return False
         x = 1
         y = self.b
         if k >= 0:
-            x *= self.b**k
+            x *= self.Powb(k)
         else:
-            y *= self.b**(-k)
+            y *= self.Powb(-k)
         if e >= 0:
-            y *= self.B**e
+            y *= self.PowB(e)
         else:
-            x *= self.B**(-e)
+            x *= self.PowB(-e)
         return x < y and y <= x * self.b
 
-    def TestCeil(self, e, min_int, max_int):
-        if self.CeilOverflow(e, min_int, max_int):
-            # print "ceil: Integer overflow at: e = {}".format(e)
+    def TestCeil(self, e, min_int, max_int, e_mul = None):
+        if e_mul is None:
+            e_mul = e * self.mul
+        if e_mul + ((1 << self.shift) - 1) > max_int or e_mul < min_int:
+            # print("ceil: Integer overflow at: e = {}".format(e))
             return False
-        k = self.Ceil(e)
+        k = (e_mul + ((1 << self.shift) - 1)) >> self.shift
         if k < min_int or k > max_int:
-            # print "ceil: Result is out of range"
+            # print("ceil: Result is out of range")
             return False
         if not self.IsCeil(k, e):
-            # print "ceil: test failed: k = {:6d}, b = {:3d}, B = {:3d}, e = {:6d}".format(k, self.b, self.B, e)
+            # print("ceil: test failed: k = {:6d}, b = {:3d}, B = {:3d}, e = {:6d}".format(k, self.b, self.B, e))
             return False
         return True
 
@@ -92,12 +161,12 @@ def FindFloorApprox(log_approx, b, B, int_width, min_exponent, max_exponent, sig
     assert min_exponent <= max_exponent
 
     print('Find approximation for floor(log_{} {}^e)'.format(b, B))
-    # print '  in [{}, {}]'.format(min_exponent, max_exponent)
-    # print 'Integer bit width: {}'.format(int_width)
+    # print('  in [{}, {}]'.format(min_exponent, max_exponent))
+    # print('Integer bit width: {}'.format(int_width))
 
     # for bits in range(int_width // 2, int_width):
     for bits in range(0, int_width):
-        # print '*** Bits = {}'.format(bits)
+        # print('*** Bits = {}'.format(bits))
 
         L = LogApprox()
         L.b = b
@@ -115,38 +184,62 @@ def FindFloorApprox(log_approx, b, B, int_width, min_exponent, max_exponent, sig
         max_e = 0
         min_e = 0
         if signed:
+            acc = 0 # == -e * L.mul
             for e in range(0, -min_exponent + 1):
-                if not L.TestFloor(-e, min_int, max_int):
+                if not L.TestFloor(-e, min_int, max_int, acc):
                     break
                 min_e = -e
+                acc -= L.mul
+        acc = 0 # == e * L.mul
         for e in range(0, max_exponent + 1):
-            if not L.TestFloor(e, min_int, max_int):
+            if not L.TestFloor(e, min_int, max_int, acc):
                 break
             max_e = e
+            acc += L.mul
 
         if min_e <= min_exponent and max_exponent <= max_e:
             max_target_exponent = max_int # 262380
             if True:
                 print('Found.')
                 print('Computing exact valid range of target exponent...')
+                # A failing e needs an integer k with k/e between mul/2^shift
+                # and log_b(B). Two distinct fractions with denominators e and
+                # 2^shift are at least 1/(e * 2^shift) apart, so the test
+                # cannot fail while |e| * 2^shift * |residual| < 1, unless
+                # e * mul is itself a multiple of 2^shift. The residual is
+                # only known to double precision, so only half of that range
+                # is skipped; the rest is walked exactly as before.
+                lb, lB = L.LogConstants()
+                residual = L.mul / float(1 << L.shift) - lB / lb
+                e_skip = 0
+                if residual != 0.0:
+                    e_skip = int(0.5 / (abs(residual) * (1 << L.shift)))
+                e_skip = min(e_skip, (1 << L.shift) // math.gcd(L.mul, 1 << L.shift) - 1)
+                e_skip = min(e_skip, max_target_exponent)
+
                 real_min_e = -min_e
                 if signed:
+                    real_min_e = max(real_min_e, min(e_skip, (-min_int) // L.mul))
+                    acc = -(real_min_e + 1) * L.mul
                     while True:
                         next_e = real_min_e + 1
                         if next_e > max_target_exponent:
                             break
-                        if not L.TestFloor(-next_e, min_int, max_int):
+                        if not L.TestFloor(-next_e, min_int, max_int, acc):
                             break
                         real_min_e = next_e
+                        acc -= L.mul
                 real_min_e = -real_min_e
-                real_max_e = max_e
+                real_max_e = max(max_e, min(e_skip, max_int // L.mul))
+                acc = (real_max_e + 1) * L.mul
                 while True:
                     next_e = real_max_e + 1
                     if next_e > max_target_exponent:
                         break
-                    if not L.TestFloor(next_e, min_int, max_int):
+                    if not L.TestFloor(next_e, min_int, max_int, acc):
                         break
                     real_max_e = next_e
+                    acc += L.mul
             else:
                 real_min_e = min_e
                 real_max_e = max_e
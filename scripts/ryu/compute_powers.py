@@ -2,43 +2,22 @@
 #
 #===============================================================================
 
-# def Sum(chunks, bits_per_chunk):
-#     assert bits_per_chunk > 0
-#     return sum( map(lambda (i, c): c * (2**bits_per_chunk)**i, enumerate(chunks)) )
-
-def Split(n, bits_per_chunk):
-    assert n >= 0
-    assert bits_per_chunk > 0
-    chunks = []
-    while True:
-        n, r = divmod(n, 2**bits_per_chunk)
-        chunks.append(r)
-        if n == 0:
-            break
-    return chunks
-
-def ToHexString(n, bits):
-    assert bits > 0
-    p = (bits + (4 - 1)) // 4       # Round up to four bits per hexit
-#   p = 2**((p - 1).bit_length())   # Round up to next power-of-2
-    assert 4*p >= n.bit_length()
-    return '0x{:0{}X}u'.format(n, p)
-
-def FormatHexChunks(n, bits_per_chunk = 64):
-    chunks = Split(n, bits_per_chunk)
-    s = ', '.join(map(lambda x: ToHexString(x, bits_per_chunk), reversed(chunks)))
-    if len(chunks) > 1:
-        s = '{' + s + '}'
-    return s
+import os.path
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from powers_common import FormatHexChunks
 
 #===============================================================================
 # Ryu
 #===============================================================================
 
+FLOOR_LOG2_POW5 = tuple((e * 38955489) >> 24 for e in range(-12654, 12654 + 1))
+
 def FloorLog2Pow5(e):
     assert e >= -12654
     assert e <=  12654
-    return (e * 38955489) >> 24
+    return FLOOR_LOG2_POW5[e + 12654]
 
 def Ceil(num, den):
     assert num >= 0
@@ -48,28 +27,65 @@ def Ceil(num, den):
         q += 1
     return q
 
+# Powers of 5 for the cached-power range, built incrementally once at module
+# load instead of re-exponentiating on every ComputeRyuPower call.
+POW5 = [1]
+for _ in range(400):
+    POW5.append(POW5[-1] * 5)
+POW5 = tuple(POW5)
+
+def Pow5(k):
+    assert k >= 0
+    return POW5[k] if k < len(POW5) else 5**k
+
 def ComputeRyuPower(k, bits):
     assert bits > 0
     e = FloorLog2Pow5(k) + 1 - bits
     if k >= 0:
         if e > 0:
-            # f = 5**k // 2**e
-            f = Ceil(5**k, 2**e)
+            # f = ceil(5^k / 2^e) as a pure shift
+            f = (Pow5(k) + (1 << e) - 1) >> e
         else:
-            f = 5**k * 2**(-e)
+            f = Pow5(k) << -e
     else:
-        f = Ceil(2**(-e), 5**(-k))
-    assert f >= 2**(bits - 1)
-    assert f < 2**bits
+        f = Ceil(1 << -e, Pow5(-k))
+    assert f >= 1 << (bits - 1)
+    assert f < 1 << bits
     return f, e
 
+def ComputeRyuPowers(min_k, max_k, bits):
+    """Yields (k,) + ComputeRyuPower(k, bits) for k in range(min_k, max_k + 1),
+    built with one running product per sweep direction instead of a fresh
+    exponentiation per entry. Only the negative half is materialized, since
+    it is constructed walking k downward but emitted in ascending order."""
+
+    # k < 0: ceil(2^-e / 5^-k)
+    neg = []
+    den = 1
+    for k in range(-1, min_k - 1, -1):
+        den *= 5
+        e = FloorLog2Pow5(k) + 1 - bits
+        q, r = divmod(1 << -e, den)
+        if k <= max_k:
+            neg.append((k, q + (r > 0), e))
+    yield from reversed(neg)
+    # k >= 0: ceil(5^k / 2^e) resp. 5^k * 2^-e
+    f5 = 1
+    for k in range(0, max_k + 1):
+        e = FloorLog2Pow5(k) + 1 - bits
+        if k >= min_k:
+            yield (k, ((f5 + (1 << e) - 1) >> e) if e > 0 else (f5 << -e), e)
+        f5 *= 5
+
 def PrintRyuPowers(bits, min_exponent, max_exponent, bits_per_chunk=64):
-    print('// Let e = FloorLog2Pow5(k) + 1 - {}'.format(bits))
-    print('// For k >= 0, stores 5^k in the form: floor( 5^k / 2^e )')
-    print('// For k <= 0, stores 5^k in the form:  ceil(2^-e / 5^-k)')
-    for k in range(min_exponent, max_exponent + 1):
-        f, e = ComputeRyuPower(k, bits)
-        print(FormatHexChunks(f, bits_per_chunk) + ', // e = {:5d}, k = {:4d}'.format(e, k))
+    # Buffer the table and emit it with a single write.
+    out = []
+    out.append(f'// Let e = FloorLog2Pow5(k) + 1 - {bits}')
+    out.append('// For k >= 0, stores 5^k in the form: floor( 5^k / 2^e )')
+    out.append('// For k <= 0, stores 5^k in the form:  ceil(2^-e / 5^-k)')
+    for k, f, e in ComputeRyuPowers(min_exponent, max_exponent, bits):
+        out.append(FormatHexChunks(f, bits_per_chunk, suffix='u') + f', // e = {e:5d}, k = {k:4d}')
+    print('\n'.join(out))
 
 # float16:
 # PrintRyuPowers(bits=32, min_exponent=0, max_exponent=9, bits_per_chunk=32)
@@ -15,7 +15,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from fractions import gcd
+try:
+    # C implementation; fractions.gcd was removed in Python 3.9.
+    from math import gcd
+except ImportError:
+    from fractions import gcd
 
 def EuclidMin(multiplier, modulo, maximum):
     """
@@ -33,18 +37,27 @@ def EuclidMin(multiplier, modulo, maximum):
     v = 1
     while True:
         while b >= a:
-            b = b - a
-            u = u - s
-            v = v - t
+            # The return value does not depend on how far -u overshoots
+            # maximum, so the whole quotient can be taken in one step.
+            q = b // a
+            b = b - a * q
+            u = u - s * q
+            v = v - t * q
             if -u >= maximum:
                 return a * c
         if b == 0:
             return 0
         while a >= b:
-            old_a = a
-            a = a - b
-            s = s - u
-            t = t - v
+            # Take as many steps as possible without s crossing maximum
+            # before the last one; old_a is then a before that last step.
+            q = a // b
+            if u != 0:
+                q = min(q, (maximum - s - 1) // (-u) + 1)
+            q = max(q, 1)
+            old_a = a - b * (q - 1)
+            a = a - b * q
+            s = s - u * q
+            t = t - v * q
             if s >= maximum:
                 if s > maximum:
                     return old_a * c